@@ -2,7 +2,7 @@
 # Copyright (c) 2016, French National Center for Scientific Research (CNRS)
 # Distributed under the (new) BSD License. See LICENSE for more info.
 
-from .client import RPCClient, RemoteCallException, Future
+from .client import RPCClient, RemoteCallException, Future, ReusableFuture, FutureGroup
 from .server import RPCServer
 from .qt_server import QtRPCServer
 from .proxy import ObjectProxy
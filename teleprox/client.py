@@ -2,16 +2,16 @@
 # Copyright (c) 2016, French National Center for Scientific Research (CNRS)
 # Distributed under the (new) BSD License. See LICENSE for more info.
 
+import os
 import re
 import socket
 import sys
 import time
-import weakref
+import itertools
 import concurrent.futures
 import threading
 import zmq
 import logging
-import numpy as np
 
 from .serializer import all_serializers
 from .server import RPCServer
@@ -22,6 +22,27 @@ from . import log
 logger = logging.getLogger(__name__)
 
 
+# Matches TCP server addresses (see RPCClient.check_address)
+_TCP_ADDR_RE = re.compile(rb'^tcp://(.+):(\d+)$')
+
+
+# Called between polls while a Future spins waiting for a reply. This gives up
+# the rest of the time slice (and the GIL), so that a server running in another
+# thread of this process -- or on a sibling hyperthread -- can produce the reply.
+if hasattr(os, 'sched_yield'):
+    _spin_pause = os.sched_yield
+else:
+    def _spin_pause():
+        time.sleep(0)
+
+
+# Pre-encoded message frames for the actions and return types used on every
+# request (see RPCClient.send).
+_action_bytes = {a: a.encode() for a in (
+    'call_obj', 'get_obj', 'get_item', 'set_item', 'delete', 'import', 'ping', 'close')}
+_return_type_bytes = {'auto': b'auto', 'proxy': b'proxy'}
+
+
 class RPCClient(object):
     """Connection to an :class:`RPCServer`.
     
@@ -62,8 +83,30 @@ class RPCClient(object):
 
     """
     
+    # Avoid a per-instance __dict__; this also makes attribute access on the
+    # request path slightly cheaper.
+    __slots__ = (
+        'name', 'address', '_address_str', 'serialize_types', '_local_server',
+        '_socket', '_sock_name', '_reentrant', '_poller', '_rx_poller',
+        '_next_request_id', 'futures', 'default_proxy_options',
+        'connect_established', 'establishing_connect', '_disconnected',
+        'serializer', '_ser_type_bytes', '__weakref__',
+    )
+    
+    # Registry of all clients, for diagnostic purposes only. Lookups in
+    # get_client use the lock-free per-thread dict below instead.
     clients_by_thread = {}  # (thread_id, rpc_addr): client
     clients_by_thread_lock = threading.Lock()
+    _local = threading.local()  # .clients = {rpc_addr: client} for this thread
+    
+    @staticmethod
+    def _thread_clients():
+        # Return the {rpc_addr: client} dict for the current thread
+        try:
+            return RPCClient._local.clients
+        except AttributeError:
+            clients = RPCClient._local.clients = {}
+            return clients
     
     @staticmethod
     def get_client(address):
@@ -79,22 +122,21 @@ class RPCClient(object):
         """
         if isinstance(address, str):
             address = address.encode()
-        key = (threading.current_thread().ident, address)
-        
         # Return an existing client if there is one
-        with RPCClient.clients_by_thread_lock:
-            if key in RPCClient.clients_by_thread:
-                return RPCClient.clients_by_thread[key]
-        
-        return RPCClient(address)
+        try:
+            return RPCClient._thread_clients()[address]
+        except KeyError:
+            return RPCClient(address)
     
     def __init__(self, address, reentrant=True, start_local_server=False, serializer='msgpack', serialize_types=None):
         if isinstance(address, str):
             address = address.encode()
+        # decoded once for use in log and error messages
+        self._address_str = address.decode()
 
         # pick a unique name: host.pid.tid:rpc_addr
         self.name = ("%s.%s.%s:%s" % (log.get_host_name(), log.get_process_name(),
-                                      log.get_thread_name(), address.decode())).encode()
+                                      log.get_thread_name(), self._address_str)).encode()
         
         self.serialize_types = serialize_types
 
@@ -108,19 +150,16 @@ class RPCClient(object):
         else:
             self._local_server = None
 
+        thread_clients = RPCClient._thread_clients()
+        if address in thread_clients:
+            raise KeyError("An RPCClient instance already exists for this address."
+                " Use RPCClient.get_client(address) instead.")
+        thread_clients[address] = self
         key = (threading.current_thread().ident, address)
         with RPCClient.clients_by_thread_lock:
-            if key in RPCClient.clients_by_thread:
-                raise KeyError("An RPCClient instance already exists for this address."
-                    " Use RPCClient.get_client(address) instead.")
             RPCClient.clients_by_thread[key] = self
 
         try:
-            # Make sure we can reach this address and there is an open socket
-            port_status = self.check_address(address)
-            if port_status == "closed":
-                raise ConnectionRefusedError(f"Connection refused to {address.decode()}")
-
             # DEALER is fully asynchronous--we can send or receive at any time, and
             # unlike ROUTER, it only connects to a single endpoint.
             self._socket = zmq.Context.instance().socket(zmq.DEALER)
@@ -130,17 +169,24 @@ class RPCClient(object):
             # it has closed. (default is -1, which can cause processes to hang
             # on exit)
             self._socket.linger = 1000
+            # Let the OS detect dead TCP peers instead of leaving requests
+            # queued on a half-open connection.
+            self._socket.setsockopt(zmq.TCP_KEEPALIVE, 1)
+            self._socket.setsockopt(zmq.TCP_KEEPALIVE_IDLE, 30)
             
             # If this thread is running a server, then we need to allow the 
             # server to process requests when the client is blocking.
             assert reentrant in (True, False)
             self._reentrant = reentrant
             self._poller = None
+            # used by _recv to wait for replies on our own socket
+            self._rx_poller = zmq.Poller()
+            self._rx_poller.register(self._socket, zmq.POLLIN)
             
-            logger.info("RPC connect to %s", address.decode())
+            logger.info("RPC connect to %s", self._address_str)
             self._socket.connect(address)
-            self.next_request_id = 0
-            self.futures = weakref.WeakValueDictionary()
+            self._next_request_id = itertools.count().__next__  # returns 0, 1, 2, ...
+            self.futures = {}  # req_id: Future; entries are removed when the result arrives
             
             # proxies generated by this client will be assigned these default options
             self.default_proxy_options = {}
@@ -156,10 +202,17 @@ class RPCClient(object):
                 self.serializer = all_serializers[serializer]()
             except KeyError:
                 raise ValueError("Unsupported serializer type '%s'" % serializer)
+            self._ser_type_bytes = self.serializer.type.encode()
             
             self.ensure_connection()
         except:
-            RPCClient.clients_by_thread[key] = None
+            thread_clients[address] = None
+            with RPCClient.clients_by_thread_lock:
+                RPCClient.clients_by_thread[key] = None
+            # don't leave the socket (and its queued ping) lingering
+            sock = getattr(self, '_socket', None)
+            if sock is not None:
+                sock.close(linger=0)
             raise
 
     @staticmethod
@@ -174,11 +227,12 @@ class RPCClient(object):
             "timeout" - if the connection times out
             None - non-tcp ports or invalid addresses
         """
-        parts = re.match(r'^tcp://(.+):(\d+)$', address.decode())
+        parts = _TCP_ADDR_RE.match(address)
         if parts is None:
             return None
         
         host, port = parts.groups()
+        host = host.decode()
         port = int(port)
 
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -221,7 +275,7 @@ class RPCClient(object):
         self._read_and_process_all()
         return self._disconnected
 
-    def send(self, action, opts=None, return_type='auto', sync='sync', timeout=10.0):
+    def send(self, action, opts=None, return_type='auto', sync='sync', timeout=10.0, future=None):
         """Send a request to the remote process.
 
         It is not necessary to call this method directly; instead use 
@@ -251,6 +305,10 @@ class RPCClient(object):
             The amount of time to wait for a response when in synchronous
             operation (sync='sync'). If the timeout elapses before a response is
             received, then raise TimeoutError.
+        future : ReusableFuture | None
+            Optional future to reuse for this request instead of creating a
+            new one. The future must belong to this client and its previous
+            request (if any) must be finished. Not allowed with sync='off'.
             
         Notes
         -----
@@ -282,39 +340,107 @@ class RPCClient(object):
             raise RuntimeError("Cannot send request; server has already disconnected.")
         
         if sync == 'off':
+            if future is not None:
+                raise ValueError("Cannot reuse a future for a request with sync='off'")
             req_id = -1
         else:
-            req_id = self.next_request_id
-            self.next_request_id += 1
-        logger.info("RPC request '%s' to %s [req_id=%s]", action, 
-                    self.address.decode(), req_id)
-        logger.debug("    => sync=%s return=%s opts=%s", sync, return_type, opts)
+            req_id = self._next_request_id()
+            if future is not None:
+                if future.client is not self:
+                    raise ValueError("Future %r does not belong to this client" % future)
+                if not future.done():
+                    raise RuntimeError("Cannot reuse %r; its request is still pending." % future)
+        # Logging calls are guarded because they run on every request, and
+        # formatting *opts* can be expensive.
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("RPC request '%s' to %s [req_id=%s]", action, 
+                        self._address_str, req_id)
+            logger.debug("    => sync=%s return=%s opts=%s", sync, return_type, opts)
         
-        if opts is None:
-            opts_str = b''
-        else:
-            opts_str = self.serializer.dumps(opts, server=None, serialize_types=self.serialize_types)
-        ser_type = self.serializer.type.encode()
-        
-        msg = [str(req_id).encode(), action.encode(), return_type.encode(), ser_type, opts_str]
-        self._socket.send_multipart(msg)
+        self._socket.send_multipart(self._request_frames(req_id, action, opts, return_type))
         
         if sync == 'off':
             return
         
-        fut = Future(self, req_id)
-        if action == 'close':
-            # for server closure we require a little special handling
-            fut.add_done_callback(self._close_request_returned)
-        self.futures[req_id] = fut
+        # Reset a reused future only once the request has been sent, so that
+        # a failure to serialize or send leaves it usable.
+        if future is not None:
+            future.reset(req_id)
+        fut = self._register_future(req_id, action, future)
         
         if sync == 'async':
             return fut
         elif sync == 'sync':
-            return fut.result(timeout=timeout)
+            try:
+                return fut.result(timeout=timeout)
+            except TimeoutError as exc:
+                # nobody else can wait on this future; stop tracking it
+                self.futures.pop(req_id, None)
+                if future is not None:
+                    # Finish the reused future with the timeout so that it can
+                    # be reset for the next request. (The late reply is then
+                    # ignored rather than completing a later request.)
+                    fut.set_exception(exc)
+                raise
         else:
             raise ValueError('Invalid sync value: %s' % sync)
 
+    def send_batch(self, requests):
+        """Send several requests to the remote process in a single message.
+        
+        All requests are delivered to the server together and processed in
+        order, which avoids the per-message overhead of sending many small
+        asynchronous requests one at a time.
+        
+        Parameters
+        ----------
+        requests : list
+            A list of ``(action, opts)`` or ``(action, opts, return_type)``
+            tuples; see :func:`send` for the meaning of each element.
+            
+        Returns
+        -------
+        futures : list
+            A list of :class:`Future` instances, one per request.
+        """
+        if self._disconnected:
+            raise RuntimeError("Cannot send request; server has already disconnected.")
+        
+        frames = []
+        futures = []
+        for request in requests:
+            action, opts = request[:2]
+            return_type = request[2] if len(request) > 2 else 'auto'
+            req_id = self._next_request_id()
+            frames.extend(self._request_frames(req_id, action, opts, return_type))
+            futures.append((req_id, action))
+        if len(frames) == 0:
+            return []
+        
+        logger.info("RPC batch of %d requests to %s", len(futures), self._address_str)
+        self._socket.send_multipart(frames)
+        return [self._register_future(req_id, action) for req_id, action in futures]
+    
+    def _request_frames(self, req_id, action, opts, return_type):
+        # Return the message frames for one request:
+        # [req_id, action, return_type, serializer type, opts]
+        if opts is None:
+            opts_str = b''
+        else:
+            opts_str = self.serializer.dumps(opts, server=None, serialize_types=self.serialize_types)
+        action_b = _action_bytes.get(action) or action.encode()
+        return_type_b = _return_type_bytes.get(return_type) or return_type.encode()
+        return (b"%d" % req_id, action_b, return_type_b, self._ser_type_bytes, opts_str)
+    
+    def _register_future(self, req_id, action, future=None):
+        # Create (or reuse) the Future that will receive the result of a request
+        fut = Future(self, req_id) if future is None else future
+        if action == 'close':
+            # for server closure we require a little special handling
+            fut.add_done_callback(self._close_request_returned)
+        self.futures[req_id] = fut
+        return fut
+
     def call_obj(self, obj, args=None, kwargs=None, **kwds):
         """Invoke a remote callable object.
         
@@ -430,19 +556,56 @@ class RPCClient(object):
         self.establishing_connect = True
         try:
             start = time.time()
+            checked_address = False
+            # The first ping is short so that a closed port is detected quickly
+            ping_timeout = 0.005
             while time.time() < start + timeout:
-                fut = self.ping(sync='async')
-                try:
-                    result = fut.result(timeout=0.1)
+                if self._ping_blocking(timeout=ping_timeout):
                     self.connect_established = True
                     return
-                except TimeoutError:
-                    continue
+                ping_timeout = 0.1
+                # Only probe the port if the server is slow to answer; this
+                # tells a closed port apart from a server that is just busy.
+                if not checked_address:
+                    checked_address = True
+                    if self.check_address(self.address, timeout=0.1) == "closed":
+                        raise ConnectionRefusedError(f"Connection refused to {self._address_str}")
             raise TimeoutError("Could not establish connection with RPC server.")
         finally:
             self.establishing_connect = False
 
-    def process_until_future(self, future, timeout=None):
+    def _ping_blocking(self, timeout):
+        # Ping the server and wait up to *timeout* seconds for the reply.
+        # Return True if the server answered.
+        #
+        # This avoids the Future machinery used by ping(), unless the server in
+        # this thread must be allowed to process requests while we wait.
+        if self._get_poller() is not None:
+            fut = self.ping(sync='async')
+            try:
+                fut.result(timeout=timeout)
+                return True
+            except TimeoutError:
+                self.futures.pop(fut.call_id, None)
+                return False
+        
+        req_id = self._next_request_id()
+        self._socket.send_multipart(self._request_frames(req_id, 'ping', None, 'auto'))
+        deadline = time.monotonic_ns() + int(timeout * 1e9)
+        while True:
+            remaining = deadline - time.monotonic_ns()
+            if remaining < 0:
+                return False
+            try:
+                msg = self._recv(remaining / 1e9)
+            except TimeoutError:
+                return False
+            if msg.get('action') == 'return' and msg['req_id'] == req_id:
+                return True
+            # not our pong (eg. the reply to an earlier ping that timed out)
+            self.process_msg(msg)
+
+    def process_until_future(self, future, timeout=None, deadline=None):
         """Process all incoming messages until receiving a result for *future*.
         
         If the future result is not raised before the timeout, then raise
@@ -453,42 +616,54 @@ class RPCClient(object):
         
         Parameters
         ----------
-        future : concurrent.Future instance
+        future : Future instance
             The Future to wait for. When the response for this Future arrives
             from the server, the method returns.
         timeout : float
             Maximum time (seconds) to wait for a response.
+        deadline : int
+            Alternative to *timeout*: the absolute time (ns, as returned by 
+            ``time.monotonic_ns()``) after which to stop waiting.
         """
-        start = time.perf_counter()
+        if deadline is None and timeout is not None:
+            deadline = time.monotonic_ns() + int(timeout * 1e9)
+        # Looked up once per call; this only changes when a server is started
+        # in this thread.
+        poller = self._get_poller()
         while not future.done():
             # wait patiently with blocking calls.
-            if timeout is None:
+            if deadline is None:
                 itimeout = None
+                itimeout_ms = None
             else:
-                dt = time.perf_counter() - start
-                itimeout = timeout - dt
-                if itimeout < 0:
+                remaining = deadline - time.monotonic_ns()
+                if remaining < 0:
                     raise TimeoutError("Timeout waiting for Future result.")
+                itimeout = remaining / 1e9
+                itimeout_ms = remaining // 1000000
                 
-            poller = self._get_poller()
+            # Each wakeup processes every reply that has already arrived, not
+            # just the first one, so bursts of replies to async requests
+            # cost a single poll.
             if poller is None:
-                self._read_and_process_one(itimeout)
+                self._read_and_process_available(itimeout)
             elif poller == 'qt':
                 # Server runs in Qt thread; we need to time-share with Qt event
                 # loop.
                 from .qt import QApplication
                 QApplication.processEvents()
                 try:
-                    self._read_and_process_one(timeout=0.05)
+                    self._read_and_process_available(timeout=0.05)
                 except TimeoutError:
                     pass
             else:
                 # Poll for input on both the client's socket and the server's
                 # socket. This is necessary to avoid deadlocks.
-                socks = [x[0] for x in poller.poll(itimeout)]
+                socks = dict(poller.poll(itimeout_ms))
                 if self._socket in socks:
-                    self._read_and_process_one(timeout=0)
+                    self._read_and_process_available(timeout=0)
                 elif len(socks) > 0: 
+                    # (only reached when the server has a request waiting)
                     server = RPCServer.get_server()
                     if server is None:
                         # this can happen after server has unregistered itself 
@@ -496,39 +671,76 @@ class RPCClient(object):
                         continue
                     server._read_and_process_one()
                 
-    def _read_and_process_one(self, timeout):
-        """Read a single message from the remote server and process it by
-        calling :func:`process_msg()`.
+    def _read_and_process_available(self, timeout):
+        """Read all messages that are available from the remote server, then
+        process them in the order received by calling :func:`process_msg()`.
         
         Parameters
         ----------
         timeout : float
-            Maximum time (seconds) to wait for a message.
+            Maximum time (seconds) to wait for the first message. Raises
+            TimeoutError if no message arrives in this time.
         
         """
+        frames = [self._recv_frame(timeout)]
+        while True:
+            try:
+                frames.append(self._socket.recv(zmq.NOBLOCK))
+            except zmq.error.Again:
+                break
+        
+        # Assign all results first, then invoke callbacks, so that callbacks
+        # (and anything waiting on several futures) see the whole batch.
+        # These messages have already been taken off the socket, so an error
+        # while decoding or processing one of them must not prevent the rest
+        # from being processed; the first error is raised once the whole
+        # batch is done.
+        finished = []
+        error = None
+        for frame in frames:
+            try:
+                fut = self._process_msg(self._loads(frame))
+            except Exception as exc:
+                if error is None:
+                    error = exc
+                continue
+            if fut is not None:
+                finished.append(fut)
+        for fut in finished:
+            fut._invoke_callbacks()
+        if error is not None:
+            raise error
+
+    def _recv(self, timeout):
+        # Receive and unserialize one message from the remote server.
+        return self._loads(self._recv_frame(timeout))
+
+    def _recv_frame(self, timeout):
+        # Receive one message frame from the remote server.
         # timeout is in seconds; convert to ms
         # use timeout=None to block indefinitely
-        if timeout is None:
-            timeout = -1
-        else:
-            timeout = int(timeout * 1000)
-        
+        # (Waiting with a poller avoids changing RCVTIMEO on every call.)
+        if timeout != 0:
+            timeout = None if timeout is None else max(0, int(timeout * 1000))
+            if not self._rx_poller.poll(timeout):
+                raise TimeoutError("Timeout waiting for Future result.")
         try:
-            # NOTE: docs say timeout can only be set before bind, but this
-            # seems to work for now.
-            self._socket.setsockopt(zmq.RCVTIMEO, timeout)
-            msg = self._socket.recv()
-            msg = self.serializer.loads(msg, server=None, proxy_opts=self.default_proxy_options)
+            data = self._socket.recv(zmq.NOBLOCK)
         except zmq.error.Again:
             raise TimeoutError("Timeout waiting for Future result.")
-        
-        self.process_msg(msg)
+        return data
+
+    def _loads(self, data):
+        # Unserialize one message received from the remote server.
+        # (Replies are received as bytes: for the small replies that make up
+        # nearly all traffic, a copying recv is faster than creating a
+        # zero-copy zmq.Frame.)
+        return self.serializer.loads(data, server=None, proxy_opts=self.default_proxy_options)
 
     def _read_and_process_all(self):
         # process all messages until none are immediately available.
         try:
-            while True:
-                self._read_and_process_one(timeout=0)
+            self._read_and_process_available(timeout=0)
         except TimeoutError:
             return
 
@@ -538,23 +750,34 @@ class RPCClient(object):
         This takes care of assigning return values or exceptions to existing
         Future instances.
         """
-        logger.debug("RPC recv result from %s [req_id=%s]", self.address.decode(), 
-                     msg.get('req_id', None))
-        logger.debug("    => %s" % msg)
+        fut = self._process_msg(msg)
+        if fut is not None:
+            fut._invoke_callbacks()
+
+    def _process_msg(self, msg):
+        # Assign the return value or exception carried by *msg* to its Future,
+        # but leave invoking the Future's callbacks to the caller. Return the
+        # Future that was completed, if any.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("RPC recv result from %s [req_id=%s]", self._address_str, 
+                         msg.get('req_id', None))
+            logger.debug("    => %s", msg)
         if msg['action'] == 'return':
             req_id = msg['req_id']
             fut = self.futures.pop(req_id, None)
             if fut is None:
-                return
+                return None
             if msg['error'] is not None:
                 exc = RemoteCallException(*msg['error'])
-                fut.set_exception(exc)
+                fut._set_exception(exc)
             else:
-                fut.set_result(msg['rval'])
+                fut._set_result(msg['rval'])
+            return fut
         elif msg['action'] == 'disconnect':
             self._server_disconnected()
         else:
             raise ValueError("Invalid action '%s'" % msg['action'])
+        return None
 
     def _close_request_returned(self, fut):
         try:
@@ -575,11 +798,12 @@ class RPCClient(object):
         # * another client requested that the server close and this client
         #   received a preemptive disconnect message from the server.
         self._disconnected = True
-        logger.debug("Received server disconnect from %s", self.address)
+        logger.debug("Received server disconnect from %s", self._address_str)
         exc = RuntimeError("Cannot receive result; server has already disconnected.")
-        for fut in self.futures.values():
-            fut.set_exception(exc)
+        futures = list(self.futures.values())
         self.futures.clear()
+        for fut in futures:
+            fut.set_exception(exc)
     
     def ping(self, sync='sync', **kwds):
         """Ping the server.
@@ -593,7 +817,11 @@ class RPCClient(object):
         """
         # reference management is disabled for now..
         #self.send('release_all', return_type=None) 
-        self._socket.close()
+        if self._disconnected:
+            # nobody is left to deliver pending messages to; don't linger
+            self._socket.close(linger=0)
+        else:
+            self._socket.close()
 
     def close_server(self, sync='sync', timeout=1.0, **kwds):
         """Ask the server to close.
@@ -612,34 +840,43 @@ class RPCClient(object):
         """Measure the clock offset between this host and the remote host.
         """
         rcounter = self._import('time').perf_counter
-        ltimes = []
-        rtimes = []
+        # Each sample compares the remote clock with the midpoint of its own
+        # round trip; samples with shorter round trips bracket the remote
+        # reading more tightly. Average the offsets from the three shortest
+        # round trips, which also rejects samples delayed by scheduling.
+        samples = []
         for i in range(10):
-            ltimes.append(time.perf_counter())
-            rtimes.append(rcounter())
-        ltimes = np.array(ltimes)
-        rtimes = np.array(rtimes[:-1])
-        dif = rtimes - ((ltimes[1:] + ltimes[:-1]) * 0.5)
-        # we can probably constrain this estimate a bit more by looking at
-        # min/max times and excluding outliers.
-        return dif.mean()
+            start = time.perf_counter()
+            rtime = rcounter()
+            stop = time.perf_counter()
+            samples.append((stop - start, rtime - (start + stop) * 0.5))
+        samples.sort()
+        best = samples[:3]
+        return sum([dif for rtt, dif in best]) / len(best)
 
     def __del__(self):
         if hasattr(self, 'socket'):
             self.close()
 
 
+# Message template for RemoteCallException; filled with the remote traceback.
+_REMOTE_EXC_TEMPLATE = '\n===> Remote exception was:\n%s'
+
+
 class RemoteCallException(Exception):
     def __init__(self, type_str, tb_str):
         self.type_str = type_str
         self.tb_str = tb_str
+        self._str = None
         
     def __str__(self):
-        msg = '\n===> Remote exception was:\n' + ''.join(self.tb_str)
-        return msg
+        # render the (possibly long) remote traceback only once
+        if self._str is None:
+            self._str = _REMOTE_EXC_TEMPLATE % ''.join(self.tb_str)
+        return self._str
 
 
-class Future(concurrent.futures.Future):
+class Future(object):
     """Represents a return value from a remote procedure call that has not
     yet arrived.
     
@@ -652,21 +889,265 @@ class Future(concurrent.futures.Future):
     call raised an exception, then calling :func:`result()` will raise 
     RemoteCallException with a transcript of the original exception.
     
-    See `concurrent.futures.Future` in the Python documentation for more information.
+    Future provides the same methods as `concurrent.futures.Future` (see the
+    Python documentation), but is not derived from it: results are always 
+    delivered by the client that created the Future, in the client's thread,
+    so none of the locking used by concurrent.futures is needed. Remote calls
+    cannot be cancelled.
+    
+    Before blocking, :func:`result()` briefly busy-polls the client socket, which
+    avoids a full poll/wakeup cycle for replies that arrive within a few
+    microseconds (loopback / inproc servers). The maximum spin time is read
+    from the ``TELEPROX_SPIN_US`` environment variable (default 2 µs; set to 0
+    to only check once for an already-received reply) and the actual budget
+    adapts to how often spinning pays off.
     """
+    # Many futures may be in flight at once; avoid a per-instance __dict__.
+    __slots__ = ('client', 'call_id', '_done', '_result', '_exception', '_callbacks')
+    
+    # Maximum and current time (ns) to spin waiting for a reply before blocking.
+    # These are shared by all futures.
+    _spin_max_ns = int(float(os.environ.get('TELEPROX_SPIN_US', 2)) * 1000)
+    _spin_budget_ns = _spin_max_ns
+    
     def __init__(self, client, call_id):
-        concurrent.futures.Future.__init__(self)
         self.client = client
         self.call_id = call_id
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = None
+    
+    def __repr__(self):
+        state = 'finished' if self._done else 'pending'
+        return "<Future %s [%s] %s>" % (self.client._address_str, self.call_id, state)
     
     def cancel(self):
         return False
 
+    def cancelled(self):
+        return False
+
+    def running(self):
+        return not self._done
+
+    def done(self):
+        """Return True if the result (or an exception) has arrived.
+        """
+        return self._done
+
     def result(self, timeout=None):
         """Return the result of this Future.
         
         If the result is not yet available, then this call will block until
         the result has arrived or the timeout elapses.
         """
-        self.client.process_until_future(self, timeout=timeout)
-        return concurrent.futures.Future.result(self)
+        if not self._done:
+            # The deadline is computed once and covers both the spin and the
+            # blocking wait.
+            deadline = None if timeout is None else time.monotonic_ns() + int(timeout * 1e9)
+            if not self._spin():
+                self._wait(deadline)
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def _wait(self, deadline):
+        # Block until the reply arrives or the deadline passes
+        start = time.perf_counter_ns()
+        self.client.process_until_future(self, deadline=deadline)
+        # If the reply arrived shortly after we gave up spinning, then a
+        # longer spin would have caught it.
+        Future._adapt_spin(quick_wake=time.perf_counter_ns() - start < 4 * Future._spin_max_ns)
+
+    def exception(self, timeout=None):
+        """Return the exception raised by the remote call, or None if the call
+        succeeded.
+        
+        If the result is not yet available, then this call will block until
+        the result has arrived or the timeout elapses.
+        """
+        if not self._done:
+            self.client.process_until_future(self, timeout=timeout)
+        return self._exception
+
+    def add_done_callback(self, fn):
+        """Attach a callable to be invoked as ``fn(future)`` when the future
+        is done. If the future is already done, then *fn* is called immediately.
+        """
+        if self._done:
+            self._call(fn)
+        elif self._callbacks is None:
+            self._callbacks = [fn]
+        else:
+            self._callbacks.append(fn)
+
+    def set_result(self, result):
+        """Set the return value of the remote call (used by RPCClient).
+        """
+        self._set_result(result)
+        self._invoke_callbacks()
+
+    def set_exception(self, exception):
+        """Set the exception raised by the remote call (used by RPCClient).
+        """
+        self._set_exception(exception)
+        self._invoke_callbacks()
+
+    def _set_result(self, result):
+        # Mark the future done without invoking callbacks
+        if self._done:
+            raise concurrent.futures.InvalidStateError("%r already has a result" % self)
+        self._result = result
+        self._done = True
+
+    def _set_exception(self, exception):
+        if self._done:
+            raise concurrent.futures.InvalidStateError("%r already has a result" % self)
+        self._exception = exception
+        self._done = True
+
+    def _invoke_callbacks(self):
+        callbacks = self._callbacks
+        if callbacks is None:
+            return
+        self._callbacks = None
+        for fn in callbacks:
+            self._call(fn)
+
+    def _call(self, fn):
+        # Exceptions raised by callbacks are logged, not propagated (as in
+        # concurrent.futures).
+        try:
+            fn(self)
+        except Exception:
+            logger.exception("Exception calling callback for %r", self)
+
+    def _spin(self):
+        # Poll the client socket without blocking until this future is done or
+        # the spin budget is used up. Return True if the future is done.
+        # The socket is always checked at least once: for fast servers the
+        # reply is often waiting already, and a non-blocking read is much
+        # cheaper than entering process_until_future.
+        deadline = time.perf_counter_ns() + Future._spin_budget_ns
+        while True:
+            self._spin_once()
+            if self._done:
+                Future._adapt_spin(hit=True)
+                return True
+            if time.perf_counter_ns() >= deadline:
+                return False
+            _spin_pause()
+
+    def _spin_once(self):
+        self.client._read_and_process_all()
+
+    @staticmethod
+    def _adapt_spin(hit=False, quick_wake=False):
+        # Grow the spin budget when spinning caught the reply (+25%) or would
+        # have caught it with a little more patience (+50%); otherwise shrink
+        # it (-12.5%). The budget is clamped to [0, _spin_max_ns].
+        max_ns = Future._spin_max_ns
+        budget = Future._spin_budget_ns
+        step = max_ns >> 3
+        if hit:
+            budget += max(budget >> 2, step)
+        elif quick_wake:
+            budget += max(budget >> 1, step)
+        else:
+            budget -= budget >> 3
+        Future._spin_budget_ns = min(max(budget, 0), max_ns)
+
+
+class ReusableFuture(Future):
+    """A Future that can be reused for a series of requests.
+    
+    Tight loops of asynchronous calls normally allocate one Future per call.
+    Instead, a ReusableFuture can be passed to each call using the 
+    ``_reuse_future`` argument to :func:`ObjectProxy.__call__()` (or the
+    *future* argument to :func:`RPCClient.send()`); the future is then reset 
+    to track the new request::
+    
+        fut = ReusableFuture(proc.client)
+        for i in range(1000):
+            remote_func(i, _sync='async', _reuse_future=fut)
+            ...
+            result = fut.result()
+    
+    Each reset discards the previous result and callbacks. A ReusableFuture
+    can only be reset after its previous request has finished.
+    
+    Parameters
+    ----------
+    client : RPCClient
+        The client that will send requests using this future.
+    """
+    __slots__ = ()
+    
+    def __init__(self, client):
+        Future.__init__(self, client, None)
+        # no request yet; allow the first reset
+        self._done = True
+
+    def reset(self, call_id):
+        """Clear this future so that it may track the request *call_id*.
+        """
+        if not self._done:
+            raise RuntimeError("Cannot reuse %r; its request is still pending." % self)
+        self.call_id = call_id
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = None
+
+
+class FutureGroup(object):
+    """A group of Futures that can be waited on together.
+    
+    Waiting on each Future in turn costs one blocking poll per Future. A 
+    FutureGroup instead keeps track of which Futures are still pending: while
+    it waits, every batch of replies read from a client completes all of the
+    corresponding Futures at once, and the group only blocks again if some 
+    are still pending::
+    
+        group = FutureGroup()
+        for x in data:
+            group.add(remote_func(x, _sync='async'))
+        results = group.wait_all(timeout=10)
+    
+    Parameters
+    ----------
+    futures : iterable
+        Initial Futures to add to the group.
+    """
+    def __init__(self, futures=()):
+        self.futures = []
+        self._pending = set()
+        for fut in futures:
+            self.add(fut)
+
+    def add(self, future):
+        """Add a Future to this group.
+        """
+        self.futures.append(future)
+        if not future.done():
+            self._pending.add(future)
+            future.add_done_callback(self._pending.discard)
+
+    def done(self):
+        """Return True if every Future in the group is done.
+        """
+        return len(self._pending) == 0
+
+    def wait_all(self, timeout=None):
+        """Wait for all Futures in the group and return a list of their results
+        (in the order the Futures were added).
+        
+        Raises TimeoutError if any result has not arrived before the timeout,
+        or the remote exception of the first failed Future.
+        """
+        deadline = None if timeout is None else time.monotonic_ns() + int(timeout * 1e9)
+        while self._pending:
+            fut = next(iter(self._pending))
+            fut.client.process_until_future(fut, deadline=deadline)
+        return [fut.result() for fut in self.futures]
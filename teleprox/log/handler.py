@@ -8,6 +8,11 @@ import threading
 import time
 import atexit
 import traceback
+import collections
+import functools
+import itertools
+import operator
+import weakref
 
 from .remote import get_host_name, get_process_name, get_thread_name
 
@@ -32,10 +37,26 @@ try:
         logging.ERROR: colorama.Style.BRIGHT + colorama.Fore.RED,
         logging.CRITICAL: colorama.Back.RED,
     }    
+    _reset = colorama.Style.RESET_ALL
 except ImportError:
     HAVE_COLORAMA = False
     
 
+# sort key for (created, arrival, record) items
+_record_created = operator.itemgetter(0)
+
+# each new thread header gets the next color in _thread_color_list
+_header_colors = itertools.cycle(_thread_color_list) if HAVE_COLORAMA else None
+
+
+@functools.lru_cache(maxsize=1024)
+def _thread_header(hid, pid, tid):
+    header = '[%s:%s:%s]' % (hid, pid, tid)
+    if HAVE_COLORAMA:
+        header = next(_header_colors) + header + colorama.Style.RESET_ALL
+    return header
+
+
 class RPCLogHandler(logging.StreamHandler):
     """StreamHandler that sorts incoming log records by their creation time
     and writes to stderr. Messages are also colored by their log level and
@@ -47,22 +68,50 @@ class RPCLogHandler(logging.StreamHandler):
     ----------
     stream : file-like
         The stream to which messages should be sent. The default is sys.stderr.
+    capacity : int
+        Maximum number of records waiting to be sorted. If records arrive 
+        faster than they can be written, the oldest are dropped and a warning
+        reports how many were lost.
     """
-    thread_headers = {}
+    # A single thread (shared by all handlers) writes out records once their
+    # sorting delay has passed; _new_record_event wakes it when records arrive.
+    _handlers = weakref.WeakSet()
+    _thread = None
+    _thread_lock = threading.Lock()
+    _new_record_event = threading.Event()
 
-    def __init__(self, stream=sys.stderr):
+    def __init__(self, stream=sys.stderr, capacity=65536):
         if HAVE_COLORAMA:
             logging.StreamHandler.__init__(self, colorama.AnsiToWin32(stream).stream)
         else:
             logging.StreamHandler.__init__(self, stream)
         
-        # Hold log records for 0.5 sec before printing them to allow sorting
-        # by creation time.
+        # Hold log records for 0.2 sec after they arrive before printing them
+        # to allow sorting by creation time. Arrival times are measured with
+        # the monotonic clock, so wall-clock adjustments (or remote hosts with
+        # skewed clocks) cannot stall or rush the output.
         self.delay = 0.2
+        # New (created, arrival, record) items are appended to this deque
+        # without locking (append and popleft are atomic).
+        self._incoming = collections.deque()
+        self.capacity = capacity
+        # Records discarded because capacity was exceeded are counted with
+        # next(), which is atomic. The polling thread also reads the count
+        # with next(); _drop_offset accounts for those reads and for the
+        # drops already reported.
+        self._drop_count = itertools.count()
+        self._drop_offset = 0
+        # The polling thread moves incoming items into this list, which is
+        # kept sorted by creation time.
         self.record_lock = threading.Lock()
         self.records = []
-        self.thread = threading.Thread(target=self.poll_records, daemon=True)
-        self.thread.start()
+        
+        with RPCLogHandler._thread_lock:
+            RPCLogHandler._handlers.add(self)
+            if RPCLogHandler._thread is None:
+                RPCLogHandler._thread = threading.Thread(target=RPCLogHandler._poll_all_records, daemon=True)
+                RPCLogHandler._thread.start()
+        self.thread = RPCLogHandler._thread
         atexit.register(self.flush_records)
 
     @property
@@ -72,25 +121,95 @@ class RPCLogHandler(logging.StreamHandler):
 
     def emit(self, record):
         # send record to sorting thread
-        with self.record_lock:
-            self.records.append(record)
-            self.records.sort(key=lambda rec: rec.created)
+        incoming = self._incoming
+        incoming.append((record.created, time.monotonic(), record))
+        if len(incoming) > self.capacity:
+            # discard the oldest record
+            try:
+                incoming.popleft()
+            except IndexError:
+                # the polling thread collected it first
+                pass
+            else:
+                next(self._drop_count)
+        if not RPCLogHandler._new_record_event.is_set():
+            RPCLogHandler._new_record_event.set()
 
-    def poll_records(self):
+    def _collect_incoming(self):
+        # Move newly emitted records into the sorted list of pending records.
+        # Must be called with record_lock held.
+        records = self.records
+        n_pending = len(records)
+        incoming = self._incoming
+        while True:
+            # (emit() may also pop from the left when capacity is exceeded)
+            try:
+                records.append(incoming.popleft())
+            except IndexError:
+                break
+        
+        dropped = next(self._drop_count) - self._drop_offset
+        self._drop_offset += dropped + 1
+        if dropped > 0:
+            rec = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': "%d log records dropped (handler capacity exceeded)", 
+                'args': (dropped,),
+            })
+            records.append((rec.created, time.monotonic(), rec))
+        
+        # Sort the whole batch at once. The pending records are already sorted
+        # and new records arrive nearly in order, so this is close to a linear
+        # merge of a few sorted runs.
+        if len(records) > n_pending:
+            records.sort(key=_record_created)
+
+    @staticmethod
+    def _poll_all_records():
+        # Run by the shared polling thread
         while True:
-            # collect all records more than 0.5 sec old
-            limit = time.time() - self.delay
-            recs = []
-            with self.record_lock:
-                while len(self.records) > 0 and self.records[0].created < limit:
-                    recs.append(self.records.pop(0))
-                    
-            # emit records or sleep
-            if len(recs) > 0:
-                for rec in recs:
-                    logging.StreamHandler.emit(self, rec)
+            # clear before collecting so that no new record can be missed
+            RPCLogHandler._new_record_event.clear()
+            wait = None
+            # (handlers may be added from other threads while we iterate)
+            with RPCLogHandler._thread_lock:
+                handlers = list(RPCLogHandler._handlers)
+            for handler in handlers:
+                # one failing handler must not stop output from the others
+                try:
+                    next_due = handler.poll_records()
+                except Exception:
+                    traceback.print_exc()
+                    continue
+                if next_due is not None and (wait is None or next_due < wait):
+                    wait = next_due
+            
+            # sleep until the oldest record is due or a new record arrives
+            RPCLogHandler._new_record_event.wait(wait)
+
+    def poll_records(self):
+        """Write out all records whose sorting delay has passed.
+        
+        Return the time (seconds) until the next pending record is due, or None
+        if no records are pending.
+        """
+        with self.record_lock:
+            self._collect_incoming()
+            records = self.records
+            limit = time.monotonic() - self.delay
+            n_due = 0
+            while n_due < len(records) and records[n_due][1] < limit:
+                n_due += 1
+            recs = [item[2] for item in records[:n_due]]
+            del records[:n_due]
+            if len(records) > 0:
+                wait = records[0][1] + self.delay - time.monotonic()
             else:
-                time.sleep(0.2)
+                wait = None
+                
+        for rec in recs:
+            logging.StreamHandler.emit(self, rec)
+        return wait
 
     def format(self, record):
         header = self.get_thread_header(record)
@@ -98,23 +217,23 @@ class RPCLogHandler(logging.StreamHandler):
         message = logging.StreamHandler.format(self, record)
         if HAVE_COLORAMA:
             ind = record.levelno // 10 * 10  # decrease to multiple of 10
-            message = _level_color_map[ind] + message + colorama.Style.RESET_ALL
-            
-        return header + ' ' + message
+            return '%s %s%s%s' % (header, _level_color_map.get(ind, ''), message, _reset)
+        else:
+            return header + ' ' + message
 
     def get_thread_header(self, record):
-        hid = getattr(record, 'hostname', get_host_name())
-        pid = getattr(record, 'process_name', get_process_name())
-        tid = getattr(record, 'thread_name', get_thread_name(record.thread))
-        key = (hid, pid, tid)
-        header = self.thread_headers.get(key, None)
-        if header is None:
-            header = '[%s:%s:%s]' % (hid, pid, tid)
-            if HAVE_COLORAMA:
-                color = _thread_color_list[len(self.thread_headers) % len(_thread_color_list)]
-                header = color + header + colorama.Style.RESET_ALL
-            self.thread_headers[key] = header
-        return header
+        # Records from remote processes carry their origin; local records are
+        # resolved only when needed.
+        hid = getattr(record, 'hostname', None)
+        if hid is None:
+            hid = get_host_name()
+        pid = getattr(record, 'process_name', None)
+        if pid is None:
+            pid = get_process_name()
+        tid = getattr(record, 'thread_name', None)
+        if tid is None:
+            tid = get_thread_name(record.thread)
+        return _thread_header(hid, pid, tid)
 
     def colorize(self, message, record):
         if not HAVE_COLORAMA:
@@ -134,7 +253,8 @@ class RPCLogHandler(logging.StreamHandler):
 
     def flush_records(self):
         with self.record_lock:
-            recs = self.records[:]
+            self._collect_incoming()
+            recs = [item[2] for item in self.records]
             self.records = []
         for rec in recs:
             logging.StreamHandler.emit(self, rec)
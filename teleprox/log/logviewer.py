@@ -3,6 +3,10 @@
 # Distributed under the (new) BSD License. See LICENSE for more info.
 
 import logging
+import collections
+import functools
+import html
+import time
 from teleprox import qt
 
 
@@ -18,16 +22,39 @@ Stylesheet = """
     .timestamp {color: #000;}
 """
 
+# Stylesheet class for each level (indexed by levelno // 10, capped at CRITICAL)
+_level_classes = ('', '', '', 'warning', 'error', 'error')
+
+
+@functools.lru_cache(maxsize=4)
+def _format_second(sec):
+    # Records arrive mostly in order, so formatting each second only once
+    # avoids a localtime/strftime call per record.
+    return time.strftime('%H:%M:%S', time.localtime(sec))
+
 
 class LogViewer(qt.QWidget):
     """QWidget for displaying and filtering log messages.
+    
+    Parameters
+    ----------
+    logger : str | logging.Logger
+        The logger (or name of logger) whose records are displayed.
+    parent : QWidget | None
+        Parent widget.
+    max_lines : int
+        Maximum number of text blocks kept in the display. When exceeded, the
+        oldest are discarded so that memory stays bounded in long sessions.
     """
-    def __init__(self, logger='', parent=None):
+    def __init__(self, logger='', parent=None, max_lines=100000):
         qt.QWidget.__init__(self, parent=parent)
         
-        # Set up handler to send log records to this widget by signal
+        # Set up handler to collect log records for this widget. Its signal
+        # only announces that records are waiting; the connection is always
+        # queued, so a burst of records logged from the GUI thread does not
+        # render each record inside the logging call.
         self.handler = QtLogHandler()
-        self.handler.new_record.connect(self.new_record)
+        self.handler.new_records.connect(self._collect_records, qt.Qt.QueuedConnection)
         if isinstance(logger, str):
             logger = logging.getLogger(logger)
         logger.addHandler(self.handler)
@@ -38,21 +65,120 @@ class LogViewer(qt.QWidget):
         self.setLayout(self.layout)
         self.text = qt.QTextBrowser()
         self.text.document().setDefaultStyleSheet(Stylesheet)
+        self.text.document().setMaximumBlockCount(max_lines)
         self.layout.addWidget(self.text, 0, 0)
         
+        # Records are collected here and added to the text browser in batches,
+        # so that a burst of records costs one document update rather than
+        # one per record.
+        self._pending = collections.deque(maxlen=max_lines)
+        self._flush_timer = qt.QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(30)
+        self._flush_timer.timeout.connect(self._flush)
+        
     def new_record(self, rec):
-        print("NEW LOG RECORD:", rec)
+        self._pending.append(rec)
+        self._schedule_flush()
+
+    def _collect_records(self):
+        # Move records collected by the handler into the pending queue
+        self._pending.extend(self.handler.take_records())
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        # While the viewer is hidden, records are only queued; they are
+        # rendered when it is shown again.
+        if self.isVisible() and not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def bulk_load(self, records):
+        """Add many log records at once (for example, when replaying history).
         
+        The records are rendered together in a single document update,
+        without waiting for the viewer's batching timer. They are
+        subject to the same level and filters as records received through
+        the handler.
+        
+        Records that were already logged to the handler (but not yet
+        displayed) are added first, so the bulk records appear after them.
+        """
+        handler = self.handler
+        self._pending.extend(handler.take_records())
+        for rec in records:
+            if rec.levelno >= handler.level and handler.filter(rec):
+                self._pending.append(rec)
+        if self.isVisible():
+            self._flush_timer.stop()
+            self._flush()
+
+    def showEvent(self, ev):
+        qt.QWidget.showEvent(self, ev)
+        if len(self._pending) > 0:
+            self._flush_timer.start()
+
+    def _flush(self):
+        # Add all pending records to the text browser
+        recs = self._pending
+        self._pending = collections.deque(maxlen=recs.maxlen)
+        if len(recs) == 0:
+            return
+        html_text = ''.join([self._record_html(rec) for rec in recs])
+        # Suppress repaints while the document grows; the view is redrawn
+        # once when updates are re-enabled.
+        self.text.setUpdatesEnabled(False)
+        try:
+            self.text.append(html_text)
+        finally:
+            self.text.setUpdatesEnabled(True)
+
+    def _record_html(self, rec):
+        # Return an HTML entry for one log record (see Stylesheet)
+        cls = _level_classes[min(rec.levelno // 10, 5)]
+        timestamp = '%s.%03d' % (_format_second(int(rec.created)), rec.msecs)
+        entry = '<div class="entry %s"><span class="timestamp">%s</span> <span class="message">%s</span>' % (
+            cls, timestamp, html.escape(rec.getMessage()))
+        if rec.exc_info and not rec.exc_text:
+            rec.exc_text = logging.Formatter().formatException(rec.exc_info)
+        if rec.exc_text:
+            entry += '<pre class="traceback">%s</pre>' % html.escape(rec.exc_text)
+        return entry + '</div>'
+
         
 
 class QtLogHandler(logging.Handler, qt.QObject):
-    """Log handler that emits a Qt signal for each record.
+    """Log handler that collects records for display in a Qt widget.
+    
+    Records may be logged from any thread. They are queued until retrieved
+    with :func:`take_records`; the ``new_records`` signal is emitted when
+    records become available after the queue was last emptied.
     """
-    new_record = qt.Signal(object)
+    new_records = qt.Signal()
     
     def __init__(self):
         logging.Handler.__init__(self)
         qt.QObject.__init__(self)
+        # append and popleft are atomic, so no extra locking is needed
+        self._records = collections.deque()
+        self._notified = False
         
-    def handle(self, record):
-        self.new_record.emit(record)
\ No newline at end of file
+    def emit(self, record):
+        self._records.append(record)
+        # One signal per batch: cleared by take_records() *before* the queue
+        # is emptied, so a record appended meanwhile is either taken or
+        # announced by a new signal.
+        if not self._notified:
+            self._notified = True
+            self.new_records.emit()
+
+    def take_records(self):
+        """Remove and return all records collected so far, in order.
+        """
+        self._notified = False
+        records = self._records
+        recs = []
+        while True:
+            try:
+                recs.append(records.popleft())
+            except IndexError:
+                return recs
\ No newline at end of file
@@ -99,6 +99,7 @@ class ObjectProxy(object):
             _attributes=attributes,
             _parent_proxy=None,
             _hash=None,
+            _encoded_state=None,  # cached by Serializer.encode
             _client_=None,
             _server_=None,
             _proxy_options={
@@ -319,6 +320,9 @@ class ObjectProxy(object):
         _timeout: float 
             Set the timeout for this call. The default value is determined by
             the 'timeout' argument to :func:`_set_proxy_options()`.
+        _reuse_future: ReusableFuture
+            Optional future to reuse for this call instead of allocating a new
+            one (see :class:`ReusableFuture`).
         
         See also
         --------
@@ -334,6 +338,7 @@ class ObjectProxy(object):
         }
         for k in opts:
             opts[k] = kwargs.pop('_'+k, opts[k])
+        opts['future'] = kwargs.pop('_reuse_future', None)
         return self._client().call_obj(obj=self, args=args, kwargs=kwargs, **opts)
 
     def __hash__(self):
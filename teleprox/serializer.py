@@ -86,7 +86,7 @@ class Serializer:
         raise NotImplementedError()
 
     def loads(self, msg, server, proxy_opts):
-        """Convert from serialized string to python object.
+        """Convert from serialized string (bytes or any buffer) to python object.
         
         Proxies that reference objects owned by the server are converted back
         into the local object. All other proxies are left as-is.
@@ -114,8 +114,13 @@ class Serializer:
                     'dtype': str(obj.dtype),
                     'shape': obj.shape}
         elif isinstance(obj, ObjectProxy):
-            ser = {encode_key: 'proxy'}
-            ser.update(obj.__getstate__())
+            # The state of a proxy never changes, so build its encoded form
+            # only once per proxy.
+            ser = obj._encoded_state
+            if ser is None:
+                ser = {encode_key: 'proxy'}
+                ser.update(obj.__getstate__())
+                obj.__dict__['_encoded_state'] = ser
             return ser
         elif isinstance(obj, datetime.datetime):
             return {encode_key: 'datetime',
@@ -233,13 +238,16 @@ class MsgpackSerializer(Serializer):
     def __init__(self):
         assert HAVE_MSGPACK
         Serializer.__init__(self)
+        # Reuse one packer (and its internal buffer) for every message rather
+        # than building a new one per call as msgpack.dumps() does.
+        self._packer = msgpack.Packer(use_bin_type=True, default=self.encode, strict_types=True)
     
     def dumps(self, obj, server, serialize_types):
         """Convert obj to msgpack string.
         """
         self._server = server
         self._serialize_types = serialize_types or default_serialize_types
-        return msgpack.dumps(obj, use_bin_type=True, default=self.encode, strict_types=True)
+        return self._packer.pack(obj)
 
     def loads(self, msg, server, proxy_opts):
         """Convert from msgpack string to python object.
@@ -286,7 +294,7 @@ class JsonSerializer(Serializer):
     def loads(self, msg, server, proxy_opts):
         self._server = server
         self._proxy_opts = proxy_opts
-        return json.loads(msg.decode(), object_hook=self.decode)
+        return json.loads(bytes(msg).decode(), object_hook=self.decode)
 
     def encode(self, obj):
         if isinstance(obj, np.ndarray):
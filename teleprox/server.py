@@ -241,16 +241,24 @@ class RPCServer(object):
     @staticmethod
     def _read_one(socket):
         parts = socket.recv_multipart()
-        name, req_id, action, return_type, ser_type, opts = parts
-
-        msg = {
+        if len(parts) == 6:
+            return parts[0], RPCServer._parse_request(*parts[1:])
+        
+        # Several requests sent together (see RPCClient.send_batch)
+        if (len(parts) - 1) % 5 != 0:
+            raise ValueError("Invalid RPC message with %d parts" % len(parts))
+        msgs = [RPCServer._parse_request(*parts[i:i+5]) for i in range(1, len(parts), 5)]
+        return parts[0], {'action': 'batch', 'msgs': msgs}
+    
+    @staticmethod
+    def _parse_request(req_id, action, return_type, ser_type, opts):
+        return {
             'req_id': int(req_id), 
             'action': action.decode(), 
             'return_type': return_type.decode(),
             'ser_type': ser_type.decode(),
             'opts': opts,
         }
-        return name, msg
         
     def _read_and_process_one(self):
         """Read one message from the rpc socket and invoke the requested
@@ -269,6 +277,11 @@ class RPCServer(object):
         This method sends back to the client either the return value or an
         error message.
         """
+        if msg['action'] == 'batch':
+            for sub_msg in msg['msgs']:
+                self._process_one(caller, sub_msg)
+            return
+        
         ser_type = msg['ser_type']
         action = msg['action']
         req_id = msg['req_id']
@@ -1,7 +1,12 @@
+import io
 import logging
+import threading
+import time
 import teleprox
 from teleprox.client import RemoteCallException
 from teleprox.log.remote import LogServer
+from teleprox.log.handler import RPCLogHandler
+from check_qt import requires_qt
 
 class TestHandler(logging.Handler):
     def __init__(self):
@@ -34,4 +39,115 @@ def test_log_server():
         assert len(handler.records) == 4
     finally:
         log_server.stop()
-        proc.kill()
\ No newline at end of file
+        proc.kill()
+
+def test_rpc_log_handler():
+    # records are written in order of creation, and records beyond the
+    # handler's capacity are reported as dropped
+    stream = io.StringIO()
+    handler = RPCLogHandler(stream=stream, capacity=5)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    now = time.time()
+    # hold the polling thread off so that all records stay queued
+    with handler.record_lock:
+        for i in [3, 1, 0, 2, 9, 8, 6, 7, 5, 4]:
+            handler.handle(logging.makeLogRecord({
+                'msg': 'record %d' % i, 'levelno': logging.INFO, 'created': now - 1 + i * 1e-3,
+            }))
+    handler.flush_records()
+    
+    lines = [line.split('] ', 1)[1] for line in stream.getvalue().splitlines()]
+    # the five most recently emitted records survive, sorted by creation time
+    assert lines[:5] == ['record %d' % i for i in [4, 5, 6, 7, 8]]
+    assert '5 log records dropped' in lines[5]
+    assert len(lines) == 6
+    
+    # every record emitted concurrently is either written or counted as dropped
+    stream = io.StringIO()
+    handler = RPCLogHandler(stream=stream, capacity=100)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    rec = logging.makeLogRecord({'msg': 'x', 'levelno': logging.INFO, 'created': now - 1})
+    def emit_records():
+        for i in range(2000):
+            handler.emit(rec)
+    with handler.record_lock:
+        threads = [threading.Thread(target=emit_records) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    handler.flush_records()
+    
+    lines = stream.getvalue().splitlines()
+    n_dropped = int(lines[-1].split('] ', 1)[1].split()[0])
+    assert len(lines) - 1 + n_dropped == 8000
+
+
+@requires_qt
+def test_log_viewer():
+    from teleprox import qt
+    from teleprox.log.logviewer import LogViewer
+    app = qt.make_qapp()
+    
+    def process_events(duration=0.1):
+        # give the viewer's batching timer a chance to fire
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            app.processEvents()
+            time.sleep(0.005)
+    
+    def messages():
+        # displayed messages, without timestamps
+        return [line.split(' ', 1)[1] for line in viewer.text.toPlainText().splitlines()]
+    
+    logger = logging.getLogger('test_log_viewer')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    viewer = LogViewer(logger, max_lines=10)
+    try:
+        viewer.show()
+        
+        # records are rendered in batches, with HTML escaped and tracebacks shown
+        logger.warning('<b>not bold</b>')
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception('caught')
+        assert viewer.text.toPlainText() == ''
+        process_events()
+        text = viewer.text.toPlainText()
+        assert messages()[:2] == ['<b>not bold</b>', 'caught']
+        assert 'ValueError: boom' in text
+        
+        # only the last max_lines lines are kept
+        for i in range(15):
+            logger.info('line %d', i)
+        process_events()
+        assert messages() == ['line %d' % i for i in range(5, 15)]
+        
+        # records logged while hidden are rendered when shown
+        viewer.hide()
+        logger.info('while hidden')
+        process_events()
+        assert 'while hidden' not in messages()
+        viewer.show()
+        process_events()
+        assert messages()[-1] == 'while hidden'
+        
+        # bulk records pass the handler's level and filters, and follow
+        # records already logged
+        viewer.handler.setLevel(logging.INFO)
+        viewer.handler.addFilter(lambda rec: rec.getMessage() != 'filtered')
+        viewer.hide()
+        logger.info('logged first')
+        bulk = [logging.makeLogRecord({'msg': msg, 'levelno': level, 'created': time.time()})
+                for msg, level in [('bulk', logging.INFO), ('debug', logging.DEBUG), ('filtered', logging.INFO)]]
+        viewer.bulk_load(bulk)
+        viewer.show()
+        process_events()
+        assert messages()[-2:] == ['logged first', 'bulk']
+        assert 'debug' not in messages()
+    finally:
+        logger.removeHandler(viewer.handler)
+        viewer.close()
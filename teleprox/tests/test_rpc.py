@@ -3,7 +3,7 @@
 # Distributed under the (new) BSD License. See LICENSE for more info.
 
 import threading, time, logging
-from teleprox import RPCClient, RemoteCallException, RPCServer, QtRPCServer, ObjectProxy, start_process
+from teleprox import RPCClient, RemoteCallException, RPCServer, QtRPCServer, ObjectProxy, ReusableFuture, FutureGroup, start_process
 from teleprox.log import RPCLogHandler, set_process_name, set_thread_name, start_log_server
 import numpy as np
 from check_qt import requires_qt, qt_available
@@ -198,6 +198,51 @@ def test_rpc():
     assert a.result() == 3
 
     
+    logger.info("-- Test future reuse --")
+    fut = ReusableFuture(client)
+    for i in range(3):
+        assert obj.add(i, 1, _sync='async', _reuse_future=fut) is fut
+        assert fut.result() == i + 1
+    obj.sleep(0.1, _sync='async', _reuse_future=fut)
+    try:
+        obj.add(1, 2, _sync='async', _reuse_future=fut)
+        assert False, "Should have raised RuntimeError"
+    except RuntimeError:
+        pass
+    fut.result()
+    # a reused future that times out can be reused for the next request
+    try:
+        obj.sleep(0.3, _timeout=0.05, _reuse_future=fut)
+        raise AssertionError('should have raised TimeoutError')
+    except TimeoutError:
+        pass
+    assert fut.done()
+    time.sleep(0.3)
+    assert obj.add(1, 2, _sync='async', _reuse_future=fut) is fut
+    assert fut.result() == 3
+    # a request that cannot be sent leaves the future reusable
+    try:
+        obj.add(object(), 2, _sync='async', _reuse_future=fut)
+        raise AssertionError('should have raised TypeError')
+    except TypeError:
+        pass
+    assert fut.done() and fut.result() == 3
+    assert obj.add(2, 2, _sync='async', _reuse_future=fut) is fut
+    assert fut.result() == 4
+
+    
+    logger.info("-- Test future groups --")
+    group = FutureGroup([obj.add(i, 1, _sync='async') for i in range(10)])
+    assert group.wait_all(timeout=5) == [i + 1 for i in range(10)]
+    assert group.done()
+
+    
+    logger.info("-- Test batched requests --")
+    futs = client.send_batch([('call_obj', {'obj': obj.add, 'args': (i, 1)}) for i in range(5)] + [('ping', None)])
+    assert [fut.result() for fut in futs] == [1, 2, 3, 4, 5, 'pong']
+    assert client.send_batch([]) == []
+
+    
     logger.info("-- Test transfer --")
     arr = np.ones(10, dtype='float32')
     arr_prox = client.transfer(arr)